@@ -2,7 +2,6 @@ import streamlit as st
 from app.config_streamlit import configurar_app
 
 # Configurar Streamlit
-st.set_page_config(page_title="Portada", layout="wide")
 configurar_app()
 
 # Título principal
@@ -0,0 +1,41 @@
+import hashlib
+import os
+import streamlit as st
+from app.config_streamlit import listar_csvs
+
+OPCION_CARPETA = "📂 Elegir desde carpeta /data"
+OPCION_SUBIR   = "⬆️ Subir archivo CSV manualmente"
+
+
+def seleccionar_perfil_csv(carpeta):
+    """
+    Columna de selección del perfil geográfico, común a las páginas de cálculo.
+
+    Permite elegir un CSV existente en `carpeta` o subir uno nuevo, que se
+    guarda en esa misma carpeta. Retorna la ruta del archivo o None.
+    """
+    st.subheader("Archivo CSV del perfil")
+    opcion_origen = st.radio(
+        "¿Cómo quieres ingresar el archivo?",
+        (OPCION_CARPETA, OPCION_SUBIR),
+    )
+
+    if opcion_origen == OPCION_CARPETA:
+        archivo_sel = st.selectbox("Selecciona perfil:", ["Selecciona"] + listar_csvs(carpeta))
+        if archivo_sel == "Selecciona":
+            return None
+        return os.path.join(carpeta, archivo_sel)
+
+    archivo = st.file_uploader("Sube el perfil geográfico", type=["csv"])
+    if archivo is None:
+        return None
+
+    P_geo_csv = os.path.join(carpeta, archivo.name)
+    # Escribir a disco sólo cuando cambia el contenido subido
+    firma = (P_geo_csv, hashlib.md5(archivo.getbuffer()).hexdigest())
+    if st.session_state.get("firma_csv_subido") != firma or not os.path.exists(P_geo_csv):
+        with open(P_geo_csv, "wb") as f:
+            f.write(archivo.getbuffer())
+        st.session_state.firma_csv_subido = firma
+    st.success(f"Archivo cargado: {archivo.name}")
+    return P_geo_csv
@@ -1,3 +1,4 @@
+import os
 import streamlit as st
 
 def configurar_app():
@@ -18,3 +19,9 @@ def configurar_app():
         </style>
     """
     st.markdown(hide_streamlit_style, unsafe_allow_html=True)
+
+
+@st.cache_data(ttl=5, show_spinner=False)
+def listar_csvs(carpeta):
+    # El escaneo del directorio se repite a lo sumo cada 5 s, no en cada rerun
+    return [f for f in os.listdir(carpeta) if f.lower().endswith(".csv")]
@@ -4,8 +4,9 @@ import numpy as np
 import altair as alt
 import os
 import json
-from src.fluido import generar_perfil_con_bombas_automaticas
+from src.fluido import cargar_perfil, generar_perfil_con_bombas_automaticas
 from app.config_streamlit import configurar_app
+from app.components import seleccionar_perfil_csv
 
 CP = None
 COOLPROP_OK = False
@@ -74,6 +75,117 @@ def propiedades_coolprop(nombre_en: str, T_C: float, P_bar: float):
         return None, None, str(e)
 
 
+@st.cache_data(show_spinner=False, max_entries=16)
+def construir_grafico(x_terr, z_terr, x_final, h_final, pn_bar, con_singularidades):
+    """
+    Gráfico Altair del perfil con bombas automáticas: terreno, línea
+    piezométrica y, según corresponda, la línea MOP y las singularidades.
+    """
+    df_terr = pd.DataFrame({"x": x_terr, "z": z_terr})
+
+    # ── Capas del gráfico con leyenda ─────────────────────────────────────
+    # Terreno: área + línea (sin leyenda, es el fondo visual)
+    terreno_area = alt.Chart(df_terr).mark_area(
+        color="saddlebrown", opacity=0.25
+    ).encode(
+        x=alt.X("x", title="Distancia Horizontal [m]"),
+        y=alt.Y("z", title="Elevación [msnm]", scale=alt.Scale(zero=False)),
+    )
+    df_terr_leg = df_terr.copy()
+    df_terr_leg["serie"] = "Terreno"
+    terreno_linea = alt.Chart(df_terr_leg).mark_line(size=2).encode(
+        x="x",
+        y=alt.Y("z", scale=alt.Scale(zero=False)),
+        color=alt.Color(
+            "serie:N",
+            scale=alt.Scale(
+                domain=["Terreno"],
+                range=["saddlebrown"],
+            ),
+            legend=alt.Legend(title="Referencias"),
+        ),
+    )
+
+    capas = [terreno_area, terreno_linea]
+
+    # MOP (si aplica)
+    if pn_bar is not None:
+        mca_max = pn_bar * 10.197
+        df_terr["mop"] = df_terr["z"] + mca_max
+        df_mop = df_terr[["x", "mop"]].copy()
+        df_mop["serie"] = f"MOP ({pn_bar} bar)"
+        linea_mop = alt.Chart(df_mop).mark_line(
+            strokeDash=[6, 4], size=2
+        ).encode(
+            x="x",
+            y=alt.Y("mop:Q", scale=alt.Scale(zero=False)),
+            color=alt.Color(
+                "serie:N",
+                scale=alt.Scale(
+                    domain=[f"MOP ({pn_bar} bar)"],
+                    range=["crimson"],
+                ),
+                legend=alt.Legend(title=None),
+            ),
+        )
+        capas.append(linea_mop)
+
+    # Línea de presión hidráulica
+    df_p = pd.DataFrame({"x": x_final, "h": h_final, "serie": "Línea piezométrica"})
+    linea_p = alt.Chart(df_p).mark_line(size=2.5).encode(
+        x="x",
+        y=alt.Y("h:Q", scale=alt.Scale(zero=False)),
+        color=alt.Color(
+            "serie:N",
+            scale=alt.Scale(
+                domain=["Línea piezométrica"],
+                range=["dodgerblue"],
+            ),
+            legend=alt.Legend(title=None),
+        ),
+    )
+    capas.append(linea_p)
+
+    # ── Singularidades: triángulo amarillo en h_antes (punto más alto) ────
+    if con_singularidades:
+        x_arr    = x_final
+        h_arr    = h_final
+        tri_rows = []
+
+        for j in range(len(x_arr) - 1):
+            if abs(x_arr[j] - x_arr[j + 1]) < 1e-9:   # mismo X
+                h_a, h_b = h_arr[j], h_arr[j + 1]
+                if h_b < h_a:                           # caída → singularidad
+                    tri_rows.append({"x": x_arr[j], "h": h_a, "serie": "Singularidad"})
+
+        if tri_rows:
+            df_tri = pd.DataFrame(tri_rows)
+            # yOffset in pixels: triangle-down size=200 → marker height ≈ 12px.
+            # Altair supports yOffset directly on mark_point as a pixel shift.
+            puntos_sing = alt.Chart(df_tri).mark_point(
+                shape="triangle-down",
+                size=200,
+                filled=True,
+                opacity=1.0,
+                yOffset=-8,   # shift up so tip of triangle touches the HGL line
+            ).encode(
+                x=alt.X("x:Q"),
+                y=alt.Y("h:Q", scale=alt.Scale(zero=False)),
+                color=alt.Color(
+                    "serie:N",
+                    scale=alt.Scale(domain=["Singularidad"], range=["gold"]),
+                    legend=alt.Legend(title=None),
+                ),
+                tooltip=[
+                    alt.Tooltip("x:Q", title="X [m]"),
+                    alt.Tooltip("h:Q", title="H [msnm]", format=".2f"),
+                ],
+            )
+            capas.append(puntos_sing)
+
+    return alt.layer(*capas).resolve_scale(color="independent").properties(height=400)
+
+
 # ── Datos globales ────────────────────────────────────────────────────────────
 materiales_disponibles = listar_materiales()
 fluidos_dict           = cargar_fluidos()           # {es: en}
@@ -118,24 +230,7 @@ col1, col2, col3, col4 = st.columns(4, border=True)
 
 # ── Columna 1: archivo CSV ────────────────────────────────────────────────────
 with col1:
-    st.subheader("Archivo CSV del perfil")
-    archivos_disponibles = [f for f in os.listdir(PATH_GEOGRAFICO) if f.endswith(".csv")]
-    opcion_origen = st.radio(
-        "¿Cómo quieres ingresar el archivo?",
-        ("📂 Elegir desde carpeta /data", "⬆️ Subir archivo CSV manualmente"),
-    )
-    P_geo_csv = None
-    if opcion_origen == "📂 Elegir desde carpeta /data":
-        archivo_sel = st.selectbox("Selecciona perfil:", ["Selecciona"] + archivos_disponibles)
-        if archivo_sel != "Selecciona":
-            P_geo_csv = os.path.join(PATH_GEOGRAFICO, archivo_sel)
-    else:
-        archivo = st.file_uploader("Sube el perfil geográfico", type=["csv"])
-        if archivo:
-            P_geo_csv = os.path.join(PATH_GEOGRAFICO, archivo.name)
-            with open(P_geo_csv, "wb") as f:
-                f.write(archivo.getbuffer())
-            st.success("Cargado en /geografico")
+    P_geo_csv = seleccionar_perfil_csv(PATH_GEOGRAFICO)
 
 
 # ── Columna 3: tubería ────────────────────────────────────────────────────────
@@ -479,117 +574,21 @@ if st.session_state.resultado_perfil_bombas_indefinido:
         if st.session_state.mostrar_aviso_desactualizado:
             st.warning("🔄 Estás viendo resultados desactualizados — presiona **Calcular perfil hidráulico** para actualizar.")
 
-        df_terr = pd.read_csv(res["archivo"], header=None)
-        df_terr.columns = ["x", "z"]
+        x_terr, z_terr = cargar_perfil(res["archivo"])
+        df_terr = pd.DataFrame({"x": x_terr, "z": z_terr})
 
         tiene_pn = res["tipo_mat"] == "pn" and res["pn_bar"] is not None
 
-        # ── Capas del gráfico con leyenda ─────────────────────────────────────
-        # Terreno: área + línea (sin leyenda, es el fondo visual)
-        terreno_area = alt.Chart(df_terr).mark_area(
-            color="saddlebrown", opacity=0.25
-        ).encode(
-            x=alt.X("x", title="Distancia Horizontal [m]"),
-            y=alt.Y("z", title="Elevación [msnm]", scale=alt.Scale(zero=False)),
+        grafico = construir_grafico(
+            x_terr, z_terr, res["x_final"], res["h_final"],
+            res["pn_bar"] if tiene_pn else None,
+            bool(res.get("singularidades")),
         )
-        df_terr_leg = df_terr.copy()
-        df_terr_leg["serie"] = "Terreno"
-        terreno_linea = alt.Chart(df_terr_leg).mark_line(size=2).encode(
-            x="x",
-            y=alt.Y("z", scale=alt.Scale(zero=False)),
-            color=alt.Color(
-                "serie:N",
-                scale=alt.Scale(
-                    domain=["Terreno"],
-                    range=["saddlebrown"],
-                ),
-                legend=alt.Legend(title="Referencias"),
-            ),
-        )
-
-        capas = [terreno_area, terreno_linea]
-
-        # MOP (si aplica)
-        if tiene_pn:
-            mca_max = res["pn_bar"] * 10.197
-            df_terr["mop"] = df_terr["z"] + mca_max
-            df_mop = df_terr[["x", "mop"]].copy()
-            df_mop["serie"] = f"MOP ({res['pn_bar']} bar)"
-            linea_mop = alt.Chart(df_mop).mark_line(
-                strokeDash=[6, 4], size=2
-            ).encode(
-                x="x",
-                y=alt.Y("mop:Q", scale=alt.Scale(zero=False)),
-                color=alt.Color(
-                    "serie:N",
-                    scale=alt.Scale(
-                        domain=[f"MOP ({res['pn_bar']} bar)"],
-                        range=["crimson"],
-                    ),
-                    legend=alt.Legend(title=None),
-                ),
-            )
-            capas.append(linea_mop)
-
-        # Línea de presión hidráulica
-        df_p = pd.DataFrame({"x": res["x_final"], "h": res["h_final"], "serie": "Línea piezométrica"})
-        linea_p = alt.Chart(df_p).mark_line(size=2.5).encode(
-            x="x",
-            y=alt.Y("h:Q", scale=alt.Scale(zero=False)),
-            color=alt.Color(
-                "serie:N",
-                scale=alt.Scale(
-                    domain=["Línea piezométrica"],
-                    range=["dodgerblue"],
-                ),
-                legend=alt.Legend(title=None),
-            ),
-        )
-        capas.append(linea_p)
-
-        # ── Singularidades: triángulo amarillo en h_antes (punto más alto) ────
-        sings_res = res.get("singularidades", [])
-        if sings_res:
-            x_arr    = res["x_final"]
-            h_arr    = res["h_final"]
-            tri_rows = []
-
-            for j in range(len(x_arr) - 1):
-                if abs(x_arr[j] - x_arr[j + 1]) < 1e-9:   # mismo X
-                    h_a, h_b = h_arr[j], h_arr[j + 1]
-                    if h_b < h_a:                           # caída → singularidad
-                        tri_rows.append({"x": x_arr[j], "h": h_a, "serie": "Singularidad"})
-
-            if tri_rows:
-                df_tri = pd.DataFrame(tri_rows)
-                # yOffset in pixels: triangle-down size=200 → marker height ≈ 12px.
-                # Altair supports yOffset directly on mark_point as a pixel shift.
-                puntos_sing = alt.Chart(df_tri).mark_point(
-                    shape="triangle-down",
-                    size=200,
-                    filled=True,
-                    opacity=1.0,
-                    yOffset=-8,   # shift up so tip of triangle touches the HGL line
-                ).encode(
-                    x=alt.X("x:Q"),
-                    y=alt.Y("h:Q", scale=alt.Scale(zero=False)),
-                    color=alt.Color(
-                        "serie:N",
-                        scale=alt.Scale(domain=["Singularidad"], range=["gold"]),
-                        legend=alt.Legend(title=None),
-                    ),
-                    tooltip=[
-                        alt.Tooltip("x:Q", title="X [m]"),
-                        alt.Tooltip("h:Q", title="H [msnm]", format=".2f"),
-                    ],
-                )
-                capas.append(puntos_sing)
-
-        grafico = alt.layer(*capas).resolve_scale(color="independent").properties(height=400)
         st.altair_chart(grafico, use_container_width=True)
 
         # ── Validación MOP ────────────────────────────────────────────────────
         if tiene_pn:
+            mca_max     = res["pn_bar"] * 10.197
             presion_max = max(res["h_final"])
             idx_max     = np.argmax(res["h_final"])
             cota_max    = df_terr.loc[
@@ -4,12 +4,45 @@ import numpy as np
 import altair as alt
 import os
 import math
-from src.fluido import generar_perfil_presion
+from src.fluido import cargar_perfil, generar_perfil_presion
 from app.config_streamlit import configurar_app
+from app.components import seleccionar_perfil_csv
 
 # Configurar Streamlit
 configurar_app()
 
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def construir_grafico(x_terr, z_terr, x_final, h_final):
+    """
+    Gráfico Altair del cálculo inverso: sólo el terreno y la línea de
+    presión que llega a la presión final, sin MOP ni singularidades.
+    """
+    df_csv = pd.DataFrame({"x": x_terr, "z": z_terr})
+
+    # Gráfico del terreno
+    terreno = alt.Chart(df_csv).mark_area(
+        color='saddlebrown', opacity=0.4
+    ).encode(
+        x=alt.X('x', axis=alt.Axis(title='Distancia [m]')),
+        y=alt.Y('z', axis=alt.Axis(title='Altura [m]'))
+    ) + alt.Chart(df_csv).mark_line(
+        color='saddlebrown'
+    ).encode(
+        x='x',
+        y='z'
+    )
+
+    # Línea de presión
+    df_presion = pd.DataFrame({"x": x_final, "Altura": h_final})
+    linea_presion = alt.Chart(df_presion).mark_line(color='deepskyblue').encode(
+        x=alt.X('x', axis=alt.Axis(title='Distancia [m]')),
+        y=alt.Y('Altura', axis=alt.Axis(title='Altura [m]'))
+    )
+
+    return terreno + linea_presion
+
+
 st.title("💦 Cálculo con Presión Final Definida")
 st.write("""
 Este módulo permite calcular el **perfil hidráulico inverso**, partiendo de una **presión final conocida** al final del sistema.  
@@ -25,33 +58,9 @@ col1, col2, col3, col4 = st.columns(4, border=True)
 
 # Columna 1: archivo CSV del perfil
 with col1:
-    st.subheader("Archivo CSV del perfil")
     BASE_DIR = os.path.dirname(os.path.dirname(__file__))
     PATH_GEOGRAFICO = os.path.join(BASE_DIR, "data", "geografico")
-    carpeta_data = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
-    archivos_disponibles = [f for f in os.listdir(PATH_GEOGRAFICO) if f.lower().endswith(".csv")]
-
-    opcion_origen = st.radio(
-        "¿Cómo quieres ingresar el archivo?",
-        ("📂 Elegir desde carpeta /data", "⬆️ Subir archivo CSV manualmente")
-    )
-
-    P_geo_csv = None
-
-    if opcion_origen == "📂 Elegir desde carpeta /data":
-        opciones_archivos = ["Selecciona archivo"] + archivos_disponibles
-        archivo_seleccionado = st.selectbox("Selecciona un archivo existente:", opciones_archivos, index=0)
-        if archivo_seleccionado != "Selecciona archivo":
-            P_geo_csv = os.path.join(PATH_GEOGRAFICO, archivo_seleccionado)
-            st.success(f"Archivo seleccionado: {archivo_seleccionado}")
-    else:
-        archivo = st.file_uploader("Sube el archivo CSV del perfil geográfico", type=["csv"])
-        if archivo is not None:
-            temp_path = os.path.join(carpeta_data, archivo.name)
-            with open(temp_path, "wb") as f:
-                f.write(archivo.getbuffer())
-            P_geo_csv = temp_path
-            st.success(f"Archivo subido correctamente: {archivo.name}")
+    P_geo_csv = seleccionar_perfil_csv(PATH_GEOGRAFICO)
 
 # Columna 2: parámetros del fluido
 with col2:
@@ -128,28 +137,6 @@ if st.session_state.resultado_perfil_bombas_indefinido:
         st.subheader("📈 Gráfico del perfil hidráulico")
 
         # Leer perfil geográfico
-        df_csv = pd.read_csv(resultado["archivo"], header=None)
-        df_csv.columns = ["x", "z"]
-
-        # Gráfico del terreno
-        terreno = alt.Chart(df_csv).mark_area(
-            color='saddlebrown', opacity=0.4
-        ).encode(
-            x=alt.X('x', axis=alt.Axis(title='Distancia [m]')),
-            y=alt.Y('z', axis=alt.Axis(title='Altura [m]'))
-        ) + alt.Chart(df_csv).mark_line(
-            color='saddlebrown'
-        ).encode(
-            x='x',
-            y='z'
-        )
-
-        # Línea de presión
-        df_presion = pd.DataFrame({"x": resultado["x_final"], "Altura": resultado["h_final"]})
-        linea_presion = alt.Chart(df_presion).mark_line(color='deepskyblue').encode(
-            x=alt.X('x', axis=alt.Axis(title='Distancia [m]')),
-            y=alt.Y('Altura', axis=alt.Axis(title='Altura [m]'))
-        )
-
-        grafico = terreno + linea_presion
+        x_terr, z_terr = cargar_perfil(resultado["archivo"])
+        grafico = construir_grafico(x_terr, z_terr, resultado["x_final"], resultado["h_final"])
         st.altair_chart(grafico, use_container_width=True)
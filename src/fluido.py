@@ -1,39 +1,114 @@
 import math
-import pandas as pd
+import os
+from functools import lru_cache
 import numpy as np
+import pandas as pd
+import streamlit as st
 from src.constantes import G
+from src.fluido_numba import NUMBA_OK, _recorrer_perfil
+
+
+@st.cache_resource(show_spinner=False)
+def _precompilar_kernels():
+    # Compila (o carga desde la caché en disco) los kernels una sola vez por proceso
+    x = np.zeros(2, dtype=np.float32)
+    _recorrer_perfil(x, x, np.zeros(1), np.zeros(2), 0.0, 10.0, 3.0, 5.0)
+    return True
+
+
+if NUMBA_OK:
+    _precompilar_kernels()
+
+
+# Sobre este tamaño de archivo se usa el lector multihilo de pyarrow
+_UMBRAL_CSV_GRANDE = 50 * 1024 * 1024
+
+
+# Cachés acotadas: cada archivo subido o parámetro nuevo agrega una entrada
+@st.cache_data(show_spinner=False, max_entries=8)
+def _leer_perfil(ruta, firma):
+    if os.path.getsize(ruta) > _UMBRAL_CSV_GRANDE:
+        arr = pd.read_csv(ruta, header=None, usecols=[0, 1], engine='pyarrow', dtype=np.float32).to_numpy()
+    else:
+        # Sólo (x, z): tolera columnas extra y la coma final de exportaciones de Excel
+        arr = np.loadtxt(ruta, delimiter=',', usecols=(0, 1), ndmin=2, dtype=np.float32, encoding='utf-8-sig')
+    # Columnas contiguas: coinciden con la firma precompilada de los kernels
+    x, z = np.ascontiguousarray(arr.T)
+    return x, z
+
+
+def cargar_perfil(P_geo_csv):
+    """
+    Lee el perfil topográfico (x, z) del CSV.
+
+    El parseo queda en caché mientras el archivo no cambie de tamaño ni de
+    fecha de modificación, así que cálculo y gráficos comparten una lectura.
+    """
+    info = os.stat(P_geo_csv)
+    return _leer_perfil(P_geo_csv, (info.st_size, info.st_mtime_ns))
 
 
 def interpolar_perfil(P_geo_csv, num_puntos_extra=10):
-    df = pd.read_csv(P_geo_csv, header=None)
-    x = df.iloc[:, 0].to_numpy()
-    z = df.iloc[:, 1].to_numpy()
+    x, z = cargar_perfil(P_geo_csv)
+    return _interpolar(x, z, num_puntos_extra)
+
 
-    x_interp = []
-    z_interp = []
+def _interpolar(x, z, num_puntos_extra):
+    # Fracciones de cada tramo (sin el extremo final, que es el inicio del siguiente)
+    t = np.linspace(0.0, 1.0, num_puntos_extra + 2, dtype=x.dtype)[:-1]
 
-    for i in range(len(x) - 1):
-        x_start, x_end = x[i], x[i + 1]
-        z_start, z_end = z[i], z[i + 1]
-        xs = np.linspace(x_start, x_end, num_puntos_extra + 2)
-        zs = np.linspace(z_start, z_end, num_puntos_extra + 2)
-        if i > 0:
-            xs = xs[1:]
-            zs = zs[1:]
-        x_interp.extend(xs)
-        z_interp.extend(zs)
+    x_interp = (x[:-1, None] + (x[1:] - x[:-1])[:, None] * t[None, :]).ravel()
+    z_interp = (z[:-1, None] + (z[1:] - z[:-1])[:, None] * t[None, :]).ravel()
 
-    return x_interp, z_interp
+    return np.concatenate((x_interp, x[-1:])), np.concatenate((z_interp, z[-1:]))
 
 
-def colebrook(Re, D, epsilon, tol=1e-6, max_iter=100):
-    f = 0.02
+def colebrook(Re, D, epsilon):
+    # Forma explícita (Swamee) válida para régimen laminar, transición y turbulento
+    return (
+        (64 / Re) ** 8
+        + 9.5 * (math.log(epsilon / (3.7 * D) + 5.74 / Re ** 0.9) - (2500 / Re) ** 6) ** -16
+    ) ** 0.125
+
+
+def colebrook_implicita(Re, D, epsilon, tol=1e-12, max_iter=20):
+    """
+    Ecuación implícita de Colebrook-White resuelta por Newton sobre y = 1/√f,
+    partiendo de la forma explícita. Referencia para validar `colebrook`.
+    """
+    a = epsilon / (3.7 * D)
+    b = 2.51 / Re
+    c = 2.0 / math.log(10)
+    y = 1.0 / math.sqrt(colebrook(Re, D, epsilon))
     for _ in range(max_iter):
-        f_old = f
-        f = (-2 * math.log10((epsilon / (3.7 * D)) + (2.51 / (Re * math.sqrt(f))))) ** -2
-        if abs(f - f_old) < tol:
+        arg = a + b * y
+        dy  = (y + c * math.log(arg)) / (1.0 + c * b / arg)
+        y  -= dy
+        if abs(dy) < tol * y:
             break
-    return f
+    return 1.0 / (y * y)
+
+
+@lru_cache(maxsize=128)
+def _reynolds_y_friccion(rho, mu, v, D, epsilon):
+    # Compartido entre generadores y páginas: mismos parámetros, mismo (Re, f)
+    Re = rho * v * D / mu
+    f  = 64 / Re if Re < 2000 else colebrook(Re, D, epsilon)
+    return Re, f
+
+
+def _perdidas_por_tramo(x, z, k):
+    # Longitud real de cada tramo por el coeficiente k = f·v²/(2·g·D).
+    # En float64 aunque el perfil sea float32: se acumulan a lo largo de todo el perfil
+    return k * np.hypot(np.diff(x.astype(np.float64)), np.diff(z.astype(np.float64)))
+
+
+def _linea_energia_inversa(x, z, k, presion_final_m):
+    # Acumula las pérdidas desde el final del perfil hacia el inicio (en float64)
+    hf        = _perdidas_por_tramo(x, z, k)
+    acumulado = np.concatenate(([0.0], np.cumsum(hf[::-1], dtype=np.float64)))[::-1]
+    # Sólo la salida vuelve a la precisión del perfil leído (float32)
+    return (presion_final_m + np.float64(z[-1]) + acumulado).astype(z.dtype, copy=False)
 
 
 def calcular_estado_final_tuberia_con_perdida(fluido, tuberia):
@@ -53,10 +128,10 @@ def calcular_estado_final_tuberia_con_perdida(fluido, tuberia):
     A2 = math.pi * (D2 ** 2) / 4
     v2 = v1 * (A1 / A2)
 
-    Re = rho * v2 * D2 / mu
-    f  = 64 / Re if Re < 2000 else colebrook(Re, D2, epsilon)
+    Re, f = _reynolds_y_friccion(rho, mu, v2, D2, epsilon)
+    k     = f * v2 * v2 / (2.0 * G * D2)
 
-    hL    = f * (L / D2) * (v2 ** 2) / (2 * G)
+    hL    = k * L
     head1 = (P1 / (rho * G)) + (v1 ** 2) / (2 * G) + z1
     head2 = head1 - hL
     P2    = rho * G * (head2 - (v2 ** 2) / (2 * G) - z2)
@@ -73,84 +148,87 @@ def calcular_estado_final_tuberia_con_perdida(fluido, tuberia):
 
 
 def generar_perfil_presion(P_geo_csv, fluido, tuberia, presion_final_m, bombas=None):
+    x, z = cargar_perfil(P_geo_csv)
+    return _perfil_presion(x, z, fluido, tuberia, presion_final_m, bombas)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _perfil_presion(x, z, fluido, tuberia, presion_final_m, bombas):
     rho = fluido['densidad']
     mu  = fluido['viscosidad']
     v   = fluido['velocidad']
 
-    df      = pd.read_csv(P_geo_csv, header=None)
-    x       = df.iloc[:, 0].to_list()
-    z       = df.iloc[:, 1].to_list()
     D       = tuberia['diametro']
     epsilon = tuberia.get('rugosidad', 0.0002)
 
-    Re = rho * v * D / mu
-    f  = 64 / Re if Re < 2000 else colebrook(Re, D, epsilon)
+    Re, f = _reynolds_y_friccion(rho, mu, v, D, epsilon)
+    k     = f * v * v / (2.0 * G * D)
 
-    x_rev = x[::-1]
-    z_rev = z[::-1]
-    h_total_rev = [presion_final_m + z_rev[0]]
-
-    for i in range(1, len(x_rev)):
-        dx     = x_rev[i - 1] - x_rev[i]
-        dz     = z_rev[i - 1] - z_rev[i]
-        L_real = math.sqrt(dx ** 2 + dz ** 2)
-        hf     = f * (L_real / D) * (v ** 2) / (2 * G)
-        h_total_rev.append(h_total_rev[-1] + hf)
-
-    x_list, h_list = x_rev[::-1], h_total_rev[::-1]
-
-    bombas  = sorted(bombas or [], key=lambda b: b['x'])
-    x_final = x_list.copy()
-    h_final = h_list.copy()
-
-    for bomba in bombas:
-        x_b  = bomba['x']
-        head = bomba['head']
-        if x_b not in x_final:
-            h_bomba = np.interp(x_b, x_final, h_final)
-            x_final.append(x_b)
-            h_final.append(h_bomba)
-
-        x_final, h_final = zip(*sorted(zip(x_final, h_final)))
-        x_final = list(x_final)
-        h_final = list(h_final)
-        idx_bomba = x_final.index(x_b)
-        h_antes   = np.interp(x_b - 1e-6, x_final, h_final) if idx_bomba > 0 else h_final[idx_bomba]
-        x_final.insert(idx_bomba, x_final[idx_bomba])
-        h_final.insert(idx_bomba, h_antes)
-        h_final[idx_bomba + 1] += head
-        for i in range(idx_bomba + 2, len(h_final)):
-            h_final[i] += head
-
-    delta   = (presion_final_m + z[-1]) - h_final[-1]
-    h_final = [h + delta for h in h_final]
+    h = _linea_energia_inversa(x, z, k, presion_final_m)
 
-    return x_final, h_final
+    bombas           = bombas or []
+    x_final, h_final = _insertar_bombas(
+        x, h, [b['x'] for b in bombas], [b['head'] for b in bombas]
+    )
+    h_final = h_final + ((presion_final_m + z[-1]) - h_final[-1])
 
+    return x_final, h_final
 
-def agregar_bomba(x_final, h_final, x_b, head):
-    h_final_original = h_final[-1]
 
-    if x_b not in x_final:
-        h_bomba = np.interp(x_b, x_final, h_final)
-        x_final.append(x_b)
-        h_final.append(h_bomba)
+def _insertar_bombas(x, h, x_bombas, head_bombas):
+    """
+    Inserta todas las bombas sobre el perfil (x, h) en una sola pasada.
 
-    x_final, h_final = zip(*sorted(zip(x_final, h_final)))
-    x_final, h_final = list(x_final), list(h_final)
+    Cada bomba agrega un par succión/descarga en su posición y eleva en su
+    head todos los puntos aguas abajo. Si cae sobre un punto existente,
+    ese punto pasa a ser la descarga.
+    """
+    x = np.asarray(x)
+    h = np.asarray(h)
+    if x.dtype.kind != 'f':
+        x = x.astype(float)
+    if h.dtype.kind != 'f':
+        h = h.astype(float)
+
+    # Ubicar las bombas en la misma precisión del perfil (float32 al leer el CSV)
+    x_bombas    = np.asarray(x_bombas, dtype=x.dtype)
+    head_bombas = np.asarray(head_bombas, dtype=float)
+    if len(x_bombas) == 0:
+        return x, h
+
+    orden       = np.argsort(x_bombas, kind='stable')
+    x_bombas    = x_bombas[orden]
+    head_bombas = head_bombas[orden]
+
+    n      = len(x)
+    idx    = np.searchsorted(x, x_bombas)
+    existe = (idx < n) & (x[np.minimum(idx, n - 1)] == x_bombas)
+    h_b    = np.where(existe, h[np.minimum(idx, n - 1)], np.interp(x_bombas, x, h))
+
+    # Head acumulado: antes de cada bomba, después de ella y en cada punto del perfil
+    acumulado = np.concatenate(([0.0], np.cumsum(head_bombas)))
+    succion   = h_b + acumulado[:-1]
+    descarga  = h_b + acumulado[1:]
+    h_perfil  = h + acumulado[np.searchsorted(x_bombas, x, side='right')]
+
+    # Los puntos que coinciden con una bomba se reemplazan por su par succión/descarga
+    quitados = np.unique(idx[existe])
+    x_resto  = np.delete(x, quitados)
+    h_resto  = np.delete(h_perfil, quitados)
+    pos      = np.repeat(idx - np.searchsorted(quitados, idx), 2)
+
+    x_final = np.insert(x_resto, pos, np.repeat(x_bombas, 2))
+    h_final = np.insert(h_resto, pos, np.column_stack((succion, descarga)).ravel())
+
+    # El head se acumula en float64; la salida conserva la precisión del perfil
+    return x_final, h_final.astype(h.dtype, copy=False)
 
-    idx_bomba = x_final.index(x_b)
-    h_antes   = np.interp(x_b - 1e-6, x_final, h_final) if idx_bomba > 0 else h_final[idx_bomba]
-    x_final.insert(idx_bomba, x_b)
-    h_final.insert(idx_bomba, h_antes)
-    h_final[idx_bomba + 1] += head
-    for i in range(idx_bomba + 2, len(h_final)):
-        h_final[i] += head
 
-    delta   = h_final_original - h_final[-1]
-    h_final = [h + delta for h in h_final]
+def agregar_bomba(x_final, h_final, x_b, head):
+    x_nuevo, h_nuevo = _insertar_bombas(x_final, h_final, [x_b], [head])
 
-    return x_final, h_final
+    # Se conserva la altura final: todo lo que está antes de la bomba baja en head
+    return x_nuevo, h_nuevo + (h_final[-1] - h_nuevo[-1])
 
 
 def generar_perfil_presion_con_bomba_desconocida(
@@ -160,32 +238,18 @@ def generar_perfil_presion_con_bomba_desconocida(
     mu  = fluido['viscosidad']
     v   = fluido['velocidad']
 
-    df      = pd.read_csv(P_geo_csv, header=None)
-    x       = df.iloc[:, 0].to_list()
-    z       = df.iloc[:, 1].to_list()
+    x, z    = cargar_perfil(P_geo_csv)
     D       = tuberia['diametro']
     epsilon = tuberia.get('rugosidad', 0.0002)
 
-    Re = rho * v * D / mu
-    f  = 64 / Re if Re < 2000 else colebrook(Re, D, epsilon)
-
-    x_rev       = x[::-1]
-    z_rev       = z[::-1]
-    h_total_rev = [presion_final_m + z_rev[0]]
+    Re, f = _reynolds_y_friccion(rho, mu, v, D, epsilon)
+    k     = f * v * v / (2.0 * G * D)
 
-    for i in range(1, len(x_rev)):
-        dx     = x_rev[i - 1] - x_rev[i]
-        dz     = z_rev[i - 1] - z_rev[i]
-        L_real = math.sqrt(dx ** 2 + dz ** 2)
-        hf     = f * (L_real / D) * (v ** 2) / (2 * G)
-        h_total_rev.append(h_total_rev[-1] + hf)
-
-    x_list, h_list = x_rev[::-1], h_total_rev[::-1]
+    h = _linea_energia_inversa(x, z, k, presion_final_m)
 
     bombas_result    = []
     bombas_conocidas = [b for b in bombas if b.get('head') is not None]
-    x_final          = x_list.copy()
-    h_final          = h_list.copy()
+    x_final, h_final = x, h
 
     for bomba in bombas_conocidas:
         x_final, h_final = agregar_bomba(x_final, h_final, bomba['x'], bomba['head'])
@@ -221,14 +285,21 @@ def generar_perfil_con_bombas_automaticas(
         Cada singularidad aplica una pérdida puntual hf = K * v² / (2g)
         en la posición x_m indicada.
     """
+    x, z = cargar_perfil(P_geo_csv)
+    return _perfil_con_bombas_automaticas(
+        x, z, fluido, tuberia, presion_inicial_m, altura_seguridad, head_bomba,
+        num_puntos_extra, singularidades,
+    )
 
-    # Leer / interpolar perfil topográfico
-    if num_puntos_extra is None:
-        df = pd.read_csv(P_geo_csv, header=None)
-        x  = df.iloc[:, 0].to_list()
-        z  = df.iloc[:, 1].to_list()
-    else:
-        x, z = interpolar_perfil(P_geo_csv, num_puntos_extra=num_puntos_extra)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _perfil_con_bombas_automaticas(
+    x, z, fluido, tuberia, presion_inicial_m, altura_seguridad, head_bomba,
+    num_puntos_extra, singularidades,
+):
+    # Interpolar perfil topográfico
+    if num_puntos_extra is not None:
+        x, z = _interpolar(x, z, num_puntos_extra)
 
     # Parámetros hidráulicos
     rho     = fluido['densidad']
@@ -237,66 +308,28 @@ def generar_perfil_con_bombas_automaticas(
     D       = tuberia['diametro']
     epsilon = tuberia.get('rugosidad', 0.0002)
 
-    Re = rho * v * D / mu
-    f  = 64 / Re if Re < 2000 else colebrook(Re, D, epsilon)
+    Re, f = _reynolds_y_friccion(rho, mu, v, D, epsilon)
+
+    k     = f * v * v / (2.0 * G * D)
+
+    # Pérdida distribuida (Darcy-Weisbach) de cada tramo
+    hf_dist = _perdidas_por_tramo(x, z, k)
 
     # Pérdida singular por unidad (hf_k = K * v² / 2g); se multiplica por k en cada punto
     hf_v = (v ** 2) / (2 * G)
 
-    # Construir lookup de singularidades mapeando al índice del punto más cercano en x
+    # Coeficiente K acumulado en el índice del punto más cercano a cada singularidad
     # Esto resuelve el problema de coincidencia exacta de floats
-    sing_por_indice: dict[int, float] = {}
+    k_sing = np.zeros(len(x))
     for s in (singularidades or []):
-        x_m = float(s["x_m"])
-        k   = float(s["k"])
-        # Encontrar el índice del punto del perfil más cercano a x_m
-        idx_cercano = int(np.argmin([abs(xi - x_m) for xi in x]))
-        sing_por_indice[idx_cercano] = sing_por_indice.get(idx_cercano, 0.0) + k
-
-    # Inicialización del recorrido
-    h_final = [presion_inicial_m + z[0]]
-    x_final = [x[0]]
-    bombas  = []
-
-    # ── Primer punto ──────────────────────────────────────────────────────────
-    h0 = presion_inicial_m + z[0]
-    if (h0 - z[0]) <= altura_seguridad:
-        h_final.append(h0 + head_bomba)
-        x_final.append(x[0])
-        bombas.append({"x": x[0], "head": head_bomba})
-    else:
-        h_final.append(h0)
-        x_final.append(x[0])
-
-    # ── Recorrido principal ───────────────────────────────────────────────────
-    for i in range(1, len(x)):
-        dx     = x[i] - x[i - 1]
-        dz     = z[i] - z[i - 1]
-        L_real = math.sqrt(dx ** 2 + dz ** 2)
-
-        # Pérdida distribuida (Darcy-Weisbach)
-        hf_dist = f * (L_real / D) * (v ** 2) / (2 * G)
-
-        h_nueva = h_final[-1] - hf_dist
-        x_final.append(x[i])
-        h_final.append(h_nueva)
-
-        # ── Aplicar singularidad si corresponde a este índice ─────────────────
-        k_sing = sing_por_indice.get(i, 0.0)
-        if k_sing > 0:
-            hf_sing      = k_sing * hf_v
-            h_antes_sing = h_nueva
-            h_tras_sing  = h_antes_sing - hf_sing
-            x_final.append(x[i])
-            h_final.append(h_tras_sing)
-            h_nueva = h_tras_sing
-
-        # ── Verificar si necesita bomba ───────────────────────────────────────
-        if (h_nueva - z[i]) <= altura_seguridad:
-            h_antes_bomba = h_nueva
-            bombas.append({"x": x[i], "head": head_bomba})
-            x_final.append(x[i])
-            h_final.append(h_antes_bomba + head_bomba)
+        idx_cercano = int(np.argmin(np.abs(x - float(s["x_m"]))))
+        k_sing[idx_cercano] += float(s["k"])
+
+    h0 = float(presion_inicial_m + z[0])
+    x_final, h_final, bombas_x = _recorrer_perfil(
+        x, z, hf_dist, k_sing, hf_v, h0, altura_seguridad, head_bomba
+    )
+    bombas = [{"x": x_b, "head": head_bomba} for x_b in bombas_x.tolist()]
 
     return x_final, h_final, bombas
 
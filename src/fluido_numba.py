@@ -0,0 +1,92 @@
+import numpy as np
+
+# Numba es opcional: sin él los kernels se ejecutan como Python puro
+NUMBA_OK = False
+try:
+    from numba import njit
+    NUMBA_OK = True
+except ImportError:
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True, fastmath=True)
+def _recorrer_perfil(x, z, hf_dist, k_sing, hf_v, h0, altura_seguridad, head_bomba):
+    """
+    Recorre el perfil desde el inicio descontando pérdidas distribuidas y
+    singulares, e insertando una bomba cada vez que la presión cae bajo la
+    altura de seguridad.
+
+    Retorna (x_final, h_final, bombas_x) recortados a su largo real.
+    """
+    n = len(x)
+
+    # Cada punto aporta a lo sumo tres posiciones: llegada, singularidad y bomba
+    # Salidas en la precisión de entrada; el recorrido acumula en float64 (h0)
+    x_out    = np.empty(3 * n, dtype=x.dtype)
+    h_out    = np.empty(3 * n, dtype=z.dtype)
+    bombas_x = np.empty(n, dtype=x.dtype)
+    m        = 0
+    nb       = 0
+
+    x_out[m] = x[0]
+    h_out[m] = h0
+    m += 1
+
+    # ── Primer punto ──────────────────────────────────────────────────────────
+    h_nueva = h0
+    if (h0 - z[0]) <= altura_seguridad:
+        h_nueva = h0 + head_bomba
+        bombas_x[nb] = x[0]
+        nb += 1
+    x_out[m] = x[0]
+    h_out[m] = h_nueva
+    m += 1
+
+    # ── Recorrido principal ───────────────────────────────────────────────────
+    for i in range(1, n):
+        h_nueva = h_nueva - hf_dist[i - 1]
+        x_out[m] = x[i]
+        h_out[m] = h_nueva
+        m += 1
+
+        if k_sing[i] > 0:
+            h_nueva = h_nueva - k_sing[i] * hf_v
+            x_out[m] = x[i]
+            h_out[m] = h_nueva
+            m += 1
+
+        if (h_nueva - z[i]) <= altura_seguridad:
+            h_nueva = h_nueva + head_bomba
+            bombas_x[nb] = x[i]
+            nb += 1
+            x_out[m] = x[i]
+            h_out[m] = h_nueva
+            m += 1
+
+    return x_out[:m], h_out[:m], bombas_x[:nb]
+
+
+@njit(cache=True)
+def _ubicar_bombas(x, h, terreno_z, x_bombas):
+    """
+    Interpola la línea de presión en cada bomba y calcula las presiones
+    manométricas en los extremos. En un x repetido (par succión/descarga)
+    la succión toma el primer punto y la descarga el último.
+
+    Retorna (h_succion, h_descarga, presion_inicial_mano, presion_final_mano).
+    """
+    n       = len(x)
+    primero = np.ones(n, dtype=np.bool_)
+    ultimo  = np.ones(n, dtype=np.bool_)
+    for i in range(1, n):
+        if x[i] == x[i - 1]:
+            primero[i]    = False
+            ultimo[i - 1] = False
+
+    h_succion  = np.interp(x_bombas, x[primero], h[primero])
+    h_descarga = np.interp(x_bombas, x[ultimo], h[ultimo])
+
+    return h_succion, h_descarga, h[0] - terreno_z[0], h[n - 1] - terreno_z[len(terreno_z) - 1]
@@ -1,11 +1,64 @@
-import matplotlib.pyplot as plt
-import pandas as pd
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+import numpy as np
+
+# Sin interfaz gráfica (servidores, generación por lotes): backend Agg
+if os.environ.get('HEADLESS'):
+    matplotlib.use('Agg')
+import matplotlib.pyplot as plt
 
-from src.fluido import generar_perfil_presion, generar_perfil_presion_con_bomba_desconocida, \
+from src.fluido import cargar_perfil, generar_perfil_presion, generar_perfil_presion_con_bomba_desconocida, \
     generar_perfil_con_bombas_automaticas
+from src.fluido_numba import _ubicar_bombas
+
+# Sobre este número de puntos las líneas de datos se rasterizan (ejes y textos siguen vectoriales)
+_UMBRAL_RASTER = 5000
+
+def _posiciones_bombas(x, h, terreno_z, bombas):
+    # float64 contiguo para que el kernel se compile una sola vez
+    x_bombas = np.array([bomba['x'] for bomba in bombas or []], dtype=np.float64)
+    return _ubicar_bombas(
+        np.ascontiguousarray(x, dtype=np.float64),
+        np.ascontiguousarray(h, dtype=np.float64),
+        np.ascontiguousarray(terreno_z, dtype=np.float64),
+        x_bombas,
+    )
 
-def graficar_perfil_con_presion(csv_path, puntos_presion=None, titulo='Perfil de Terreno CSB con Presión'):
+def _dibujar_bombas(ax, bombas, h_bombas, h_etiquetas):
+    # Triángulos rojos sobre la línea de presión en un solo artista, y el head de cada bomba
+    xs_b = [bomba['x'] for bomba in bombas]
+    ax.scatter(xs_b, h_bombas, color='red', marker='^', s=80, label='Bomba')
+    # Etiquetas formateadas de una vez; fuera del cálculo de tight_layout
+    etiquetas = [f"+{bomba['head']:.2f} m" for bomba in bombas]
+    for x_b, h_etiqueta, etiqueta in zip(xs_b, h_etiquetas, etiquetas):
+        ax.text(x_b, h_etiqueta, etiqueta, color='red', ha='center', fontsize=9, in_layout=False)
+
+def _preparar_ejes(ax):
+    # Reutiliza el Axes del llamador (limpio) o crea una figura nueva
+    if ax is None:
+        return plt.subplots(figsize=(10, 6), dpi=150)
+    ax.clear()
+    return ax.figure, ax
+
+def _mostrar_o_guardar(fig, ax, ruta_salida, ajustar=True, propia=True):
+    # Guarda o muestra la figura y libera las creadas aquí; las del llamador quedan abiertas
+    # y su Axes es lo que se retorna (una figura propia ya cerrada retorna None).
+    # Al guardar, bbox_inches='tight' mide los textos una sola vez y evita tight_layout.
+    if ruta_salida:
+        fig.savefig(ruta_salida, bbox_inches='tight')
+    elif propia:
+        if ajustar:
+            fig.tight_layout()
+        plt.show()
+    if propia:
+        plt.close(fig)
+        return None
+    return ax
+
+def graficar_perfil_con_presion(csv_path, puntos_presion=None, titulo='Perfil de Terreno CSB con Presión',
+                                ruta_salida=None, ax=None):
     """
     Grafica el perfil del terreno y opcionalmente puntos de presión en la tubería.
 
@@ -17,27 +70,34 @@ def graficar_perfil_con_presion(csv_path, puntos_presion=None, titulo='Perfil de
         Ejemplo: ([0, 5, 10], [12, 14, 13])
     titulo : str
         Título del gráfico.
+    ruta_salida : str, opcional
+        Si se indica, guarda el gráfico en esa ruta en lugar de mostrarlo.
+    ax : matplotlib.axes.Axes, opcional
+        Axes a reutilizar; se limpia antes de dibujar y su figura no se muestra ni se cierra.
+        Sólo en ese caso la función retorna el Axes; si no, retorna None.
     """
-    # Leer CSV
-    df = pd.read_csv(csv_path, header=None)
-    distancia_terreno = df.iloc[:, 0]
-    altura_terreno = df.iloc[:, 1]
+    # Leer CSV (np.loadtxt en float32, en caché mientras el archivo no cambie)
+    distancia_terreno, altura_terreno = cargar_perfil(csv_path)
 
-    plt.figure(figsize=(10, 6))
+    propia  = ax is None
+    fig, ax = _preparar_ejes(ax)
     # Perfil del terreno
-    plt.plot(distancia_terreno, altura_terreno, '-', color='green', label='Terreno CSB')
+    ax.plot(distancia_terreno, altura_terreno, '-', color='green', label='Terreno CSB',
+            rasterized=len(distancia_terreno) > _UMBRAL_RASTER)
 
     # Puntos de presión en la tubería
     if puntos_presion is not None:
-        dist_p, alt_p = puntos_presion
-        plt.plot(dist_p, alt_p, '-', color='red', label='Altura presión tubería')
+        dist_p = np.asarray(puntos_presion[0], dtype=np.float32)
+        alt_p  = np.asarray(puntos_presion[1], dtype=np.float32)
+        ax.plot(dist_p, alt_p, '-', color='red', label='Altura presión tubería',
+                rasterized=len(dist_p) > _UMBRAL_RASTER)
 
-    plt.xlabel('Distancia horizontal [m]')
-    plt.ylabel('Altura [m]')
-    plt.title(titulo)
-    plt.grid(True)
-    plt.legend()
-    plt.show()
+    ax.set_xlabel('Distancia horizontal [m]')
+    ax.set_ylabel('Altura [m]')
+    ax.set_title(titulo)
+    ax.grid(True)
+    ax.legend()
+    return _mostrar_o_guardar(fig, ax, ruta_salida, ajustar=False, propia=propia)
 
 def graficar_perfil_y_presion(
     P_geo_csv,
@@ -46,11 +106,15 @@ def graficar_perfil_y_presion(
     presion_final_m,
     presion_inicial_m=None,
     bombas=None,
-    titulo='Perfil y Línea de Presión'
+    titulo='Perfil y Línea de Presión',
+    ruta_salida=None,
+    ax=None
 ):
     """
     Grafica el perfil topográfico y la línea de presión del fluido,
     considerando opcionalmente bombas y presión inicial conocida.
+    Con `ruta_salida` el gráfico se guarda en archivo en lugar de mostrarse;
+    con `ax` se dibuja sobre un Axes existente, que se limpia antes y se retorna.
     """
 
     # Generar perfil de presión
@@ -62,46 +126,36 @@ def graficar_perfil_y_presion(
             P_geo_csv, fluido, tuberia, presion_inicial_m, presion_final_m, bombas=bombas
         )
 
-    # Leer perfil topográfico
-    df = pd.read_csv(P_geo_csv, header=None)
-    terreno_x = df[0].to_list()
-    terreno_y = df[1].to_list()
+    # Perfil topográfico: misma lectura en caché que usó el generador
+    terreno_x, terreno_y = cargar_perfil(P_geo_csv)
 
     # Crear figura
-    plt.figure(figsize=(10, 6))
-    plt.plot(terreno_x, terreno_y, '-', color='green', label='Terreno CSB')
-    plt.plot(x, h_presion, '-', color='blue', label='Línea de presión del fluido')
+    propia  = ax is None
+    fig, ax = _preparar_ejes(ax)
+    ax.plot(terreno_x, terreno_y, '-', color='green', label='Terreno CSB',
+            rasterized=len(terreno_x) > _UMBRAL_RASTER)
+    ax.plot(x, h_presion, '-', color='blue', label='Línea de presión del fluido',
+            rasterized=len(x) > _UMBRAL_RASTER)
+
+    # Altura interpolada de cada bomba y presiones manométricas, en una sola pasada
+    h_bombas, _, presion_inicial_mano, presion_final_mano = _posiciones_bombas(
+        x, h_presion, terreno_y, bombas_result
+    )
 
     # Graficar bombas sobre la línea de presión
     if bombas_result:
-        print(bombas_result)
-        for bomba in bombas_result:
-            x_b = bomba['x']
-            head_b = bomba['head']
-            # Encontrar índice del punto más cercano
-            idx = min(range(len(x)), key=lambda i: abs(x[i] - x_b))
-            h_bomba = h_presion[idx]
-
-            # Marcador exactamente sobre la línea de presión
-            plt.scatter(x_b, h_bomba, color='red', marker='^', s=80,
-                        label='Bomba' if 'Bomba' not in plt.gca().get_legend_handles_labels()[1] else "")
-            plt.text(x_b, h_bomba + 0.5, f"+{head_b:.2f} m", color='red', ha='center', fontsize=9)
-
-    # Mostrar presiones manométricas inicial y final
-    presion_inicial_mano = h_presion[0] - terreno_y[0]
-    presion_final_mano = h_presion[-1] - terreno_y[-1]
-
-    plt.text(x[0], h_presion[0] + 1, f"{presion_inicial_mano:.2f} m", color='black', fontsize=9, ha='center')
-    plt.text(x[-1], h_presion[-1] + 1, f"{presion_final_mano:.2f} m", color='black', fontsize=9, ha='center')
+        _dibujar_bombas(ax, bombas_result, h_bombas, h_bombas + 0.5)
+
+    ax.text(x[0], h_presion[0] + 1, f"{presion_inicial_mano:.2f} m", color='black', fontsize=9, ha='center')
+    ax.text(x[-1], h_presion[-1] + 1, f"{presion_final_mano:.2f} m", color='black', fontsize=9, ha='center')
 
     # Detalles del gráfico
-    plt.xlabel('Distancia horizontal [m]')
-    plt.ylabel('Altura [m]')
-    plt.title(titulo)
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
+    ax.set_xlabel('Distancia horizontal [m]')
+    ax.set_ylabel('Altura [m]')
+    ax.set_title(titulo)
+    ax.legend()
+    ax.grid(True)
+    return _mostrar_o_guardar(fig, ax, ruta_salida, propia=propia)
 
 def graficar_perfil_con_bombas_automaticas(
     P_geo_csv,
@@ -109,7 +163,9 @@ def graficar_perfil_con_bombas_automaticas(
     h_final,
     bombas,
     pn_bar=None,
-    titulo='Perfil con Bombas Automáticas'
+    titulo='Perfil con Bombas Automáticas',
+    ruta_salida=None,
+    ax=None
 ):
     """
     Grafica el perfil topográfico y la línea de presión generada automáticamente
@@ -127,58 +183,91 @@ def graficar_perfil_con_bombas_automaticas(
         Lista de bombas con 'x' y 'head'.
     titulo : str
         Título del gráfico.
+    ruta_salida : str, opcional
+        Si se indica, guarda el gráfico en esa ruta en lugar de mostrarlo.
+    ax : matplotlib.axes.Axes, opcional
+        Axes a reutilizar; se limpia antes de dibujar y su figura no se muestra ni se cierra.
+        Sólo en ese caso la función retorna el Axes; si no, retorna None.
     """
 
-    # Leer perfil del terreno
-    df = pd.read_csv(P_geo_csv, header=None)
-    terreno_x = df[0].to_list()
-    terreno_y = df[1].to_list()
+    # Perfil del terreno: misma lectura en caché que usó el generador
+    terreno_x, terreno_y = cargar_perfil(P_geo_csv)
 
     # Crear figura
-    plt.figure(figsize=(10, 6))
+    propia  = ax is None
+    fig, ax = _preparar_ejes(ax)
 
     # 1. Dibujar el MOP (Máxima Presión de Operación)
     if pn_bar:
         mca_max = pn_bar * 10.197  # Conversión Bar a metros
         # El MOP es el terreno + la resistencia de la tubería
         mop_line = [z + mca_max for z in terreno_y]
-        plt.plot(terreno_x, mop_line, '--', color='red', alpha=0.6, label=f'MOP ({pn_bar} Bar)')
+        ax.plot(terreno_x, mop_line, '--', color='red', alpha=0.6, label=f'MOP ({pn_bar} Bar)',
+                rasterized=len(terreno_x) > _UMBRAL_RASTER)
         # Opcional: Sombrear el área prohibida
-        plt.fill_between(terreno_x, mop_line, max(mop_line)+10, color='red', alpha=0.05)
+        ax.fill_between(terreno_x, mop_line, max(mop_line)+10, color='red', alpha=0.05,
+                        rasterized=len(terreno_x) > _UMBRAL_RASTER)
 
     # Dibujar terreno y línea de presión
-    plt.plot(terreno_x, terreno_y, '-', color='green', label='Terreno CSB')
-    plt.plot(x_final, h_final, '-', color='blue', label='Línea de presión del fluido')
+    ax.plot(terreno_x, terreno_y, '-', color='green', label='Terreno CSB',
+            rasterized=len(terreno_x) > _UMBRAL_RASTER)
+    ax.plot(x_final, h_final, '-', color='blue', label='Línea de presión del fluido',
+            rasterized=len(x_final) > _UMBRAL_RASTER)
 
-    # Dibujar bombas si existen
+    # Altura interpolada de cada bomba y presiones manométricas, en una sola pasada
+    h_bombas, h_descargas, presion_inicial_mano, presion_final_mano = _posiciones_bombas(
+        x_final, h_final, terreno_y, bombas
+    )
+
+    # Dibujar bombas si existen; el head se rotula sobre la descarga
     if bombas:
-        for bomba in bombas:
-            x_b = bomba['x']
-            head_b = bomba['head']
-            # Buscar el punto más cercano para ubicar el triángulo sobre la línea de presión
-            idx = min(range(len(x_final)), key=lambda i: abs(x_final[i] - x_b))
-            h_bomba = h_final[idx]
+        _dibujar_bombas(ax, bombas, h_bombas, h_descargas + 1)
+
+    ax.text(x_final[0], terreno_y[0] - 2, f"{presion_inicial_mano:.2f} m", color='black', fontsize=9, ha='center')
+    ax.text(x_final[-1], terreno_y[-1] - 2, f"{presion_final_mano:.2f} m", color='black', fontsize=9, ha='center')
 
-            # Triángulo rojo encima de la línea de presión
-            plt.scatter(x_b, h_bomba, color='red', marker='^', s=80,
-                        label='Bomba' if 'Bomba' not in plt.gca().get_legend_handles_labels()[1] else "")
-            plt.text(x_b, h_final[idx + 1] + 1, f"+{head_b:.2f} m", color='red', ha='center', fontsize=9)
+    # Configuración del gráfico
+    ax.set_xlabel('Distancia horizontal [m]')
+    ax.set_ylabel('Altura [m]')
+    ax.set_title(titulo)
+    ax.legend()
+    ax.grid(True)
+    return _mostrar_o_guardar(fig, ax, ruta_salida, propia=propia)
 
-    # Presiones manométricas inicial y final
-    presion_inicial_mano = h_final[0] - terreno_y[0]
-    presion_final_mano = h_final[-1] - terreno_y[-1]
+def _graficar_a_archivo(tarea):
+    # Se ejecuta en un proceso aparte: cada uno con su propio estado de pyplot y backend Agg
+    plt.switch_backend('Agg')
+    ruta_csv, ruta_salida, kwargs = tarea
+    graficar_perfil_y_presion(ruta_csv, ruta_salida=ruta_salida, **kwargs)
+    return ruta_salida
 
-    plt.text(x_final[0], terreno_y[0] - 2, f"{presion_inicial_mano:.2f} m", color='black', fontsize=9, ha='center')
-    plt.text(x_final[-1], terreno_y[-1] - 2, f"{presion_final_mano:.2f} m", color='black', fontsize=9, ha='center')
+def _rutas_png_unicas(rutas_csv, carpeta_salida):
+    # Un PNG por CSV con el nombre del archivo; si se repite (otra carpeta o la misma ruta) se numera
+    usados, rutas_png = set(), []
+    for ruta in rutas_csv:
+        base   = os.path.splitext(os.path.basename(ruta))[0]
+        nombre = base + '.png'
+        n      = 1
+        while nombre in usados:
+            n     += 1
+            nombre = f"{base}_{n}.png"
+        usados.add(nombre)
+        rutas_png.append(os.path.join(carpeta_salida, nombre))
+    return rutas_png
 
-    # Configuración del gráfico
-    plt.xlabel('Distancia horizontal [m]')
-    plt.ylabel('Altura [m]')
-    plt.title(titulo)
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
+def graficar_lote(rutas_csv, carpeta_salida, max_procesos=None, **kwargs):
+    """
+    Genera en paralelo el gráfico de perfil y presión de varios CSV y los
+    guarda como PNG en `carpeta_salida`. Los argumentos restantes se pasan a
+    `graficar_perfil_y_presion`. Retorna las rutas de los archivos generados.
+    """
+    os.makedirs(carpeta_salida, exist_ok=True)
+    tareas = [
+        (ruta, ruta_png, kwargs)
+        for ruta, ruta_png in zip(rutas_csv, _rutas_png_unicas(rutas_csv, carpeta_salida))
+    ]
+    with ProcessPoolExecutor(max_workers=max_procesos) as ex:
+        return list(ex.map(_graficar_a_archivo, tareas))
 
 if __name__ == "__main__":
     BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -192,15 +281,31 @@ if __name__ == "__main__":
         {'x': 120, 'head': None}
     ]
 
-    graficar_perfil_y_presion(
-        csv_path,
-        fluido=fluido,
-        tuberia=tuberia,
-        presion_final_m=28,
-        presion_inicial_m=15,
-        bombas=bombas,
-        titulo='Perfil con Bombas'
-    )
+    if '--lote' in sys.argv[1:]:
+        # Lote: todos los perfiles de data/geografico, un proceso por gráfico
+        carpeta = os.path.join(BASE_DIR, 'data', 'geografico')
+        rutas   = [os.path.join(carpeta, nombre) for nombre in sorted(os.listdir(carpeta))
+                   if nombre.lower().endswith('.csv')]
+        graficar_lote(
+            rutas,
+            os.path.join(BASE_DIR, 'salidas'),
+            fluido=fluido,
+            tuberia=tuberia,
+            presion_final_m=28,
+            presion_inicial_m=15,
+            bombas=bombas,
+            titulo='Perfil con Bombas'
+        )
+    else:
+        graficar_perfil_y_presion(
+            csv_path,
+            fluido=fluido,
+            tuberia=tuberia,
+            presion_final_m=28,
+            presion_inicial_m=15,
+            bombas=bombas,
+            titulo='Perfil con Bombas'
+        )
 
     # x_final, h_final, bombas = generar_perfil_con_bombas_automaticas(
     #     P_geo_csv=csv_path,
@@ -1,5 +1,27 @@
+import os
+import tempfile
 import unittest
-from src.fluido import calcular_estado_final_tuberia_con_perdida
+from unittest import mock
+import numpy as np
+from src.fluido import (
+    _insertar_bombas,
+    _perfil_con_bombas_automaticas,
+    _perfil_presion,
+    agregar_bomba,
+    colebrook,
+    colebrook_implicita,
+    calcular_estado_final_tuberia_con_perdida,
+    cargar_perfil,
+    generar_perfil_con_bombas_automaticas,
+    generar_perfil_presion,
+    interpolar_perfil,
+)
+from src.fluido_numba import _recorrer_perfil
+
+P_GEO_CSV = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'geografico', 'P_geo.csv')
+FLUIDO = {'densidad': 946, 'viscosidad': 0.00025, 'velocidad': 1.1}
+TUBERIA = {'diametro': 0.257, 'rugosidad': 0.045}
+SINGULARIDADES = [{'x_m': 100.0, 'k': 0.9}, {'x_m': 400.0, 'k': 2.0}]
 
 class TestCalculoTuberia(unittest.TestCase):
     def test_resultado_basico(self):
@@ -27,5 +49,131 @@ class TestCalculoTuberia(unittest.TestCase):
         self.assertGreater(resultado['numero_reynolds'], 2000)
         self.assertTrue(0.01 < resultado['factor_friccion'] < 0.1)
 
+    def test_colebrook_explicita_vs_implicita(self):
+        for Re in (4e3, 1e5, 1e7):
+            f_imp = colebrook_implicita(Re, 0.1, 0.0002)
+            self.assertAlmostEqual(colebrook(Re, 0.1, 0.0002) / f_imp, 1.0, delta=0.03)
+
+    def test_colebrook_zona_de_transicion(self):
+        # Entre Re 2000 y 4000 la forma explícita queda ~9 % bajo Colebrook-White
+        f_exp = colebrook(3000, 0.1, 0.0002)
+        self.assertAlmostEqual(f_exp, 0.0412, places=4)
+        self.assertAlmostEqual(f_exp / colebrook_implicita(3000, 0.1, 0.0002), 0.909, places=2)
+
+class TestCargarPerfil(unittest.TestCase):
+    def test_coma_final(self):
+        # Exportación típica de Excel: "x,z," en cada línea
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = os.path.join(carpeta, 'perfil.csv')
+            with open(ruta, 'w') as f:
+                f.write("0,10,\n5,12,\n10,11,\n")
+            x, z = cargar_perfil(ruta)
+
+        np.testing.assert_allclose(x, [0.0, 5.0, 10.0])
+        np.testing.assert_allclose(z, [10.0, 12.0, 11.0])
+
+class TestInterpolarPerfil(unittest.TestCase):
+    def test_puntos_intermedios(self):
+        perfil = np.loadtxt(P_GEO_CSV, delimiter=',')
+        x, z = interpolar_perfil(P_GEO_CSV, num_puntos_extra=3)
+
+        self.assertEqual(len(x), (len(perfil) - 1) * 4 + 1)
+        np.testing.assert_allclose(x[::4], perfil[:, 0])
+        np.testing.assert_allclose(z[::4], perfil[:, 1])
+        self.assertTrue(np.all(np.diff(x) > 0))
+
+class TestAgregarBomba(unittest.TestCase):
+    def test_bomba_entre_puntos(self):
+        x, h = agregar_bomba([0.0, 10.0, 20.0], [30.0, 20.0, 10.0], 15.0, 5.0)
+
+        np.testing.assert_allclose(x, [0.0, 10.0, 15.0, 15.0, 20.0])
+        np.testing.assert_allclose(h, [25.0, 15.0, 10.0, 15.0, 10.0])
+
+    def test_bomba_sobre_punto_existente(self):
+        x, h = agregar_bomba([0.0, 10.0, 20.0], [30.0, 20.0, 10.0], 10.0, 5.0)
+
+        np.testing.assert_allclose(x, [0.0, 10.0, 10.0, 20.0])
+        np.testing.assert_allclose(h, [25.0, 15.0, 20.0, 10.0])
+
+class TestInsertarBombas(unittest.TestCase):
+    X = [0.0, 10.0, 20.0, 30.0]
+    H = [40.0, 30.0, 20.0, 10.0]
+
+    def test_dos_bombas_entre_puntos_desordenadas(self):
+        x, h = _insertar_bombas(self.X, self.H, [25.0, 5.0], [4.0, 2.0])
+
+        np.testing.assert_allclose(x, [0.0, 5.0, 5.0, 10.0, 20.0, 25.0, 25.0, 30.0])
+        np.testing.assert_allclose(h, [40.0, 35.0, 37.0, 32.0, 22.0, 17.0, 21.0, 16.0])
+
+    def test_bomba_sobre_punto_y_bomba_entre_puntos(self):
+        x, h = _insertar_bombas(self.X, self.H, [10.0, 25.0], [3.0, 4.0])
+
+        np.testing.assert_allclose(x, [0.0, 10.0, 10.0, 20.0, 25.0, 25.0, 30.0])
+        np.testing.assert_allclose(h, [40.0, 30.0, 33.0, 23.0, 18.0, 22.0, 17.0])
+
+    def test_dos_bombas_en_el_mismo_x(self):
+        # Un par succión/descarga por bomba, apilados en el orden de entrada
+        x, h = _insertar_bombas(self.X, self.H, [15.0, 15.0], [2.0, 3.0])
+
+        np.testing.assert_allclose(x, [0.0, 10.0, 15.0, 15.0, 15.0, 15.0, 20.0, 30.0])
+        np.testing.assert_allclose(h, [40.0, 30.0, 25.0, 27.0, 27.0, 30.0, 25.0, 15.0])
+
+class TestPerfilPresion(unittest.TestCase):
+    def test_float32_dentro_de_tolerancia(self):
+        bombas = [{'x': 150.0, 'head': 7.0}]
+        perfil = np.loadtxt(P_GEO_CSV, delimiter=',')
+
+        x, h     = generar_perfil_presion(P_GEO_CSV, FLUIDO, TUBERIA, 28.0, bombas)
+        x64, h64 = _perfil_presion(perfil[:, 0], perfil[:, 1], FLUIDO, TUBERIA, 28.0, bombas)
+
+        self.assertEqual(x.dtype, np.float32)
+        np.testing.assert_allclose(x, x64, rtol=1e-6)
+        np.testing.assert_allclose(h, h64, rtol=1e-5)
+        self.assertAlmostEqual(h[-1] - perfil[-1, 1], 28.0, places=3)
+
+    def test_float32_bombas_automaticas(self):
+        perfil = np.loadtxt(P_GEO_CSV, delimiter=',')
+
+        x, h, bombas = generar_perfil_con_bombas_automaticas(
+            P_GEO_CSV, FLUIDO, TUBERIA, 2.0, 3.0, 6.0, num_puntos_extra=5, singularidades=SINGULARIDADES
+        )
+        x64, h64, bombas64 = _perfil_con_bombas_automaticas(
+            perfil[:, 0], perfil[:, 1], FLUIDO, TUBERIA, 2.0, 3.0, 6.0, 5, SINGULARIDADES
+        )
+
+        self.assertEqual(h.dtype, np.float32)
+        self.assertEqual(len(bombas), len(bombas64))
+        np.testing.assert_allclose([b['x'] for b in bombas], [b['x'] for b in bombas64], atol=1e-4)
+        self.assertEqual(len(x), len(x64))
+        np.testing.assert_allclose(h, h64, atol=1e-4)
+
+class TestBombasAutomaticas(unittest.TestCase):
+    BOMBAS = [0.0, 17.6113, 86.8165, 131.8457, 145.3222, 174.3413, 222.5534]
+
+    def verificar(self, x, h, bombas):
+        # 103 puntos con 5 intermedios: 613 llegadas, más el punto inicial repetido,
+        # 2 singularidades y 6 bombas tras la del primer punto
+        self.assertEqual(len(x), 622)
+        self.assertEqual(len(h), 622)
+        np.testing.assert_allclose([b['x'] for b in bombas], self.BOMBAS, atol=1e-4)
+        self.assertAlmostEqual(float(h[0]), 13.9564, places=3)
+        self.assertAlmostEqual(float(h[-1]), 41.0029, places=3)
+
+    def test_perfil_con_singularidades(self):
+        self.verificar(*generar_perfil_con_bombas_automaticas(
+            P_GEO_CSV, FLUIDO, TUBERIA, 2.0, 3.0, 6.0,
+            num_puntos_extra=5, singularidades=SINGULARIDADES,
+        ))
+
+    def test_kernel_python_puro(self):
+        # Mismo recorrido con el kernel sin compilar (equivale a NUMBA_DISABLE_JIT=1)
+        kernel = getattr(_recorrer_perfil, 'py_func', _recorrer_perfil)
+        perfil = np.loadtxt(P_GEO_CSV, delimiter=',', dtype=np.float32)
+        with mock.patch('src.fluido._recorrer_perfil', kernel):
+            self.verificar(*_perfil_con_bombas_automaticas.__wrapped__(
+                perfil[:, 0].copy(), perfil[:, 1].copy(), FLUIDO, TUBERIA,
+                2.0, 3.0, 6.0, 5, SINGULARIDADES,
+            ))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file